@@ -1,31 +1,15 @@
 # -*- coding: utf-8 -*-
-from functools import partial
-
 from .graph import SearchSpace
 from .store import ScopeStore
 
 
-def sget(key, *args, frame=None):
-    try:
-        return frame.context.get_record(key)
-    except KeyError:
-        if len(args) == 1:
-            return args[0]
-        raise
-
-
-def sput(key, value, frame=None):
-    return frame.w_context.put_record(key, value)
-
-
-def sput_all(key, value, frame=None):
-    return frame.store.init.put_record(key, value)
-
-
 class Frame(object):  # pylint: disable=too-many-instance-attributes
 
-    ro_keys = ('node_counter', 'open_nodes_counter',)
     INIT_CONTEXT_ID = -1
+    __slots__ = (
+        'solver', 'search_space', 'store', 'node_counter', 'selected', 'context', 'test_results', 'ro_builtins',
+        'w_builtins', 'ro_globals', 'w_globals', 'discarded_weight'
+    )
 
     def __init__(self, solver, store: ScopeStore, search_space: SearchSpace):
         self.solver = solver
@@ -34,25 +18,53 @@ class Frame(object):  # pylint: disable=too-many-instance-attributes
         self.node_counter = 0
         self.selected = None
         self.context = self.store.init
+        # the lowest weight of the nodes discarded for being above the solver max_weight
+        self.discarded_weight = None
+        # the tests are evaluated with the same context during a frame, their results are kept until the next one
+        self.test_results = {}
         self.ro_builtins = solver.builtins or {}
         self.ro_builtins['logger'] = solver.logger
-        self.ro_builtins['sget'] = partial(sget, frame=self)
-        self.w_builtins = dict(self.ro_builtins)
-        self.w_builtins['sput'] = partial(sput, frame=self)
-        self.w_builtins['sput_all'] = partial(sput_all, frame=self)
-        self._init_builtins()
-
-    def _init_builtins(self):
-        self.ro_builtins['node_counter'] = self.node_counter
-        self.ro_builtins['open_nodes_counter'] = self.search_space.get_len_open_nodes()
-        for key in self.ro_keys:
-            self.w_builtins[key] = self.ro_builtins[key]
+        self.ro_builtins['sget'] = self.sget
+        self._init_builtins(self.ro_builtins)
+        self.w_builtins = dict(self.ro_builtins, sput=self.sput, sput_all=self.sput_all)
+        # eval adds __builtins__ to its globals, the strategies evaluating code get their own copies of the builtins
+        self.ro_globals = dict(self.ro_builtins)
+        self.w_globals = dict(self.w_builtins)
+
+    def _init_builtins(self, *builtins):
+        node_counter = self.node_counter
+        open_nodes_counter = self.search_space.get_len_open_nodes()
+        for bins in builtins:
+            bins['node_counter'] = node_counter
+            bins['open_nodes_counter'] = open_nodes_counter
 
     def next_frame(self):
         self.node_counter += 1
-        context_id = self.selected.context_id
+        self.set_context(self.selected.context_id)
+        self._init_builtins(self.ro_builtins, self.w_builtins, self.ro_globals, self.w_globals)
+
+    def set_context(self, context_id):
+        """
+        Changes the context the builtins read from, e.g. to test a node created from another context.
+        Parameters:
+            context_id(object): The id of the scope to read from, or `INIT_CONTEXT_ID` for the init scope.
+        """
+        self.test_results.clear()
         self.context = self.store.get_scope(context_id) if context_id != self.INIT_CONTEXT_ID else self.store.init
-        self._init_builtins()
+
+    def sget(self, key, *args):
+        try:
+            return self.context.get_record(key)
+        except KeyError:
+            if len(args) == 1:
+                return args[0]
+            raise
+
+    def sput(self, key, value):
+        return self.w_context.put_record(key, value)
+
+    def sput_all(self, key, value):
+        return self.store.init.put_record(key, value)
 
     @property
     def final_context(self):
@@ -64,11 +76,14 @@ class Frame(object):  # pylint: disable=too-many-instance-attributes
 
     @property
     def w_context(self):
-        if self.selected.context_id != self.selected.node_id:
-            if self.selected.context_id != self.INIT_CONTEXT_ID:
-                self.context = self.store.create_scope(self.selected.node_id, self.selected.context_id)
+        selected = self.selected
+        node_id = selected.node_id
+        context_id = selected.context_id
+        if context_id != node_id:
+            if context_id != self.INIT_CONTEXT_ID:
+                self.context = self.store.create_scope(node_id, context_id)
             else:
-                self.context = self.store.create_scope(self.selected.node_id)
-            self.selected.context_id = self.selected.node_id
-            self.search_space.update_node(self.selected)
+                self.context = self.store.create_scope(node_id)
+            selected.context_id = node_id
+            self.search_space.update_node(selected)
         return self.context
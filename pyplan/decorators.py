@@ -15,3 +15,12 @@ def inherit_doc(cls):
                     func.__doc__ = parfunc.__doc__
                     break
     return cls
+
+
+def builtins_mapping(func):
+    """
+    This decorator marks a strategy that accepts the solver builtins as a dictionary in its `builtins` parameter,
+    so the solver can pass them by reference instead of expanding them as keyword arguments on every call.
+    """
+    func.builtins_mapping = True
+    return func
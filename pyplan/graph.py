@@ -1,28 +1,41 @@
 # -*- coding: utf-8 -*-
-import bisect
+import heapq
+from collections import OrderedDict
+from contextlib import contextmanager
 from functools import partialmethod
+from itertools import count
 
 from .nodes import Node
 from .serializers import NodeSerializer, get_default_node_serializer
-from .store import CollectionMap, get_default_collection
+from .store import CollectionMap, IndexedCollectionMap, get_default_collection
 
 
 class Graph(object):
     """
     This is the base class for a graph data structure.
     This implementation is using adjacent lists in order to save node relations.
+    The most recently used nodes are cached so they are not deserialized each time they are requested, unless
+    the collection stores the `Node` objects themselves (see `CollectionMap.store_native`).
+    Node updates can be grouped using `batch`, so each node is saved only once.
+    The successors of the nodes are cached until any node of the graph is updated, so querying a graph that is
+    not modified, as the domain of a `Solver`, does not need to find them each time.
     """
+    DEFAULT_CACHE_SIZE = 4096
 
-    def __init__(self, collection: CollectionMap=None, node_serializer: NodeSerializer=None):
+    def __init__(self, collection: CollectionMap=None, node_serializer: NodeSerializer=None, cache_size=None):
         """
         Initializes the graph.
         Parameters:
             collection(CollectionMap): Is the collection used to save/load graph nodes.
             node_serializer(NodeSerializer): Is the serializer to load/save nodes form the collection.
+            cache_size(int): Maximum number of deserialized nodes kept in memory.
         """
-        self._collection = collection or get_default_collection()
+        self._collection = collection if collection is not None else get_default_collection()
         self._node_serializer = node_serializer or get_default_node_serializer()
-        self._nodes_in_use = {}
+        self._cache_size = cache_size or self.DEFAULT_CACHE_SIZE
+        self._node_cache = OrderedDict()
+        self._batch = None
+        self._successors = {}
 
     def __iter__(self):
         """
@@ -44,12 +57,18 @@ class Graph(object):
         node_id = node_id or self._collection.next_id()
         node = self._node_serializer.from_data(self, node_id, **kwargs)
         node.graph = self
-        self._collection.insert_record(node_id, self._node_serializer.to_data(node))
+        changed = []
+        # the arcs are added before saving the new node so it is only written once
         if in_nodes:
-            self.create_relationships(in_nodes, node)
+            for source_node in ((in_nodes,) if isinstance(in_nodes, Node) else in_nodes):
+                changed.extend(self._add_arc(source_node, node))
         if out_nodes:
-            self.create_relationships(node, out_nodes)
-        self._nodes_in_use[node_id] = node
+            for target_node in ((out_nodes,) if isinstance(out_nodes, Node) else out_nodes):
+                changed.extend(self._add_arc(node, target_node))
+        self._collection.insert_record(node_id, self._to_record(node))
+        self._cache_node(node)
+        if changed:
+            self.update_nodes(changed_node for changed_node in changed if changed_node is not node)
         return node
 
     def create_relationships(self, source_nodes, target_nodes):
@@ -59,6 +78,9 @@ class Graph(object):
             source_nodes(list or Node): Nodes origin of the arc.
             target_nodes(list or Node): Nodes destination of the arc.
         """
+        if isinstance(source_nodes, Node) and isinstance(target_nodes, Node):
+            self.create_relationship(source_nodes, target_nodes)
+            return
         source_nodes = (source_nodes,) if isinstance(source_nodes, Node) else source_nodes
         target_nodes = (target_nodes,) if isinstance(target_nodes, Node) else target_nodes
         for source_node in source_nodes:
@@ -72,25 +94,75 @@ class Graph(object):
             source_node(Node): Node origin of the arc.
             target_node(Node): Node destination of the arc.
         """
+        for node in self._add_arc(source_node, target_node):
+            self.update_node(node)
+
+    def _add_arc(self, source_node: Node, target_node: Node):  # pylint: disable=no-self-use
+        """
+        Adds an arc to the adjacency sets of the nodes without saving them.
+        Returns:
+            list: The nodes that have been modified.
+        """
+        changed = []
         if target_node.node_id not in source_node.out_nodes_ids:
             source_node.out_nodes_ids.add(target_node.node_id)
-            self._collection.put_record(source_node.node_id, self._node_serializer.to_data(source_node))
+            changed.append(source_node)
         if source_node.node_id not in target_node.in_nodes_ids:
             target_node.in_nodes_ids.add(source_node.node_id)
-            self._collection.put_record(target_node.node_id, self._node_serializer.to_data(target_node))
+            changed.append(target_node)
+        return changed
+
+    @contextmanager
+    def batch(self):
+        """
+        Delays the node updates done inside the context until it exits, then all the updated nodes are saved
+        with a single call to the collection. A node updated several times is saved once with its last state.
+        Nested batches are merged into the outermost one. New nodes are still inserted immediately as the
+        collection assigns their ids.
+        """
+        if self._batch is not None:
+            yield self
+            return
+        self._batch = {}
+        try:
+            yield self
+        finally:
+            pending, self._batch = self._batch, None
+            if pending:
+                self.update_nodes(pending.values())
 
     def update_node(self, node: Node):
-        self._collection.put_record(node.node_id, self._node_serializer.to_data(node))
+        if self._successors:
+            self._successors.clear()
+        if self._batch is not None:
+            self._batch[node.node_id] = node
+            return
+        self._collection.put_record(node.node_id, self._to_record(node))
+        self._cache_node(node)
 
     def update_nodes(self, nodes):
+        """
+        Saves several nodes with a single call to the collection.
+        """
+        if self._successors:
+            self._successors.clear()
+        if self._batch is not None:
+            self._batch.update((node.node_id, node) for node in nodes)
+            return
+        nodes = list(nodes)
+        self._collection.put_records((node.node_id, self._to_record(node)) for node in nodes)
         for node in nodes:
-            self.update_node(node)
+            self._cache_node(node)
 
     def has_relationship(self, source_node: Node, target_node: Node) -> bool:  # pylint: disable=no-self-use
         """
         Checks if there is a connection from source_node to target_node.
         """
-        return source_node.node_id in target_node.in_nodes_ids
+        in_nodes_ids = target_node.in_nodes_ids
+        out_nodes_ids = source_node.out_nodes_ids
+        if len(in_nodes_ids) <= len(out_nodes_ids):
+            return source_node.node_id in in_nodes_ids
+        return target_node.node_id in out_nodes_ids
 
     def get_node(self, node_id) -> Node:
         """
@@ -102,14 +174,47 @@ class Graph(object):
         Raises:
             KeyError: If the node_id is invalid.
         """
-        return self._node_serializer.from_data(graph=self, **self._collection.get_record(node_id))
+        if self._collection.store_native:
+            return self._collection.get_record(node_id)
+        try:
+            node = self._node_cache[node_id]
+        except KeyError:
+            if self._batch and node_id in self._batch:
+                return self._batch[node_id]
+            node = self._node_serializer.from_data(graph=self, **self._collection.get_record(node_id))
+            self._cache_node(node)
+        else:
+            self._node_cache.move_to_end(node_id)
+        return node
 
     def get_nodes(self, ids):
         """
         Gets a generator of nodes finding them by its node_id. See get_node.
+        The nodes that are not cached are requested to the collection at once.
         """
+        if self._collection.store_native:
+            return self._collection.get_records(ids)
+        ids = list(ids)
+        pending = self._batch or ()
+        missing = [node_id for node_id in ids if node_id not in self._node_cache and node_id not in pending]
+        if missing:
+            for record in self._collection.get_records(missing):
+                self._cache_node(self._node_serializer.from_data(graph=self, **record))
         return (self.get_node(node_id) for node_id in ids)
 
+    def _to_record(self, node: Node):
+        collection = self._collection
+        return node if collection.store_native else self._node_serializer.to_data(node, collection.in_process)
+
+    def _cache_node(self, node: Node):
+        if self._collection.store_native:
+            return
+        cache = self._node_cache
+        cache[node.node_id] = node
+        cache.move_to_end(node.node_id)
+        if len(cache) > self._cache_size:
+            cache.popitem(last=False)
+
     def is_successor(self, child_node: Node, parent_node: Node) -> bool:
         """
         Checks if child_node is a successor of parent_node.
@@ -124,52 +229,163 @@ class Graph(object):
 
     def successors(self, node: Node):
         """
-        Returns a generator over the successor `Node` of node.
+        Returns a tuple with the successor `Node` of node.
         """
-        return iter(self.get_node(node_id) for node_id in node.out_nodes_ids)
+        successors = self._successors.get(node.node_id)
+        if successors is None:
+            successors = self._successors[node.node_id] = tuple(self.get_nodes(node.out_nodes_ids))
+        return successors
 
     def predecessors(self, node: Node):
         """
         Returns a generator over the predecessor `Node` of node.
         """
-        return iter(self.get_node(node_id) for node_id in node.in_nodes_ids)
+        return self.get_nodes(node.in_nodes_ids)
 
     node_builder = partialmethod(create_node)
     """This adds some syntax sugar in order to create a kind of DSL"""
 
 
-class SearchSpace(Graph):
+class DirectedGraph(Graph):
+    """
+    A `Graph` whose nodes only keep the ids of their successors, so creating an arc only updates its source
+    node. Predecessors are found using a reverse index that is built the first time they are requested.
+    """
+
+    def __init__(self, collection: CollectionMap=None, node_serializer: NodeSerializer=None, cache_size=None):
+        super().__init__(collection, node_serializer, cache_size)
+        self._reverse_index = None
+
+    def _add_arc(self, source_node: Node, target_node: Node):
+        if target_node.node_id in source_node.out_nodes_ids:
+            return []
+        source_node.out_nodes_ids.add(target_node.node_id)
+        if self._reverse_index is not None:
+            self._reverse_index.setdefault(target_node.node_id, set()).add(source_node.node_id)
+        return [source_node]
+
+    def has_relationship(self, source_node: Node, target_node: Node) -> bool:
+        return target_node.node_id in source_node.out_nodes_ids
+
+    def predecessors(self, node: Node):
+        return self.get_nodes(self._get_reverse_index().get(node.node_id, ()))
+
+    def _get_reverse_index(self):
+        if self._reverse_index is None:
+            reverse_index = {}
+            for node in self:
+                for node_id in node.out_nodes_ids:
+                    reverse_index.setdefault(node_id, set()).add(node.node_id)
+            self._reverse_index = reverse_index
+        return self._reverse_index
+
+
+class SearchSpace(DirectedGraph):
+    """
+    A `Graph` that keeps track of the nodes that are open during the search. By default its nodes are saved
+    in an `IndexedCollectionMap` as their ids are consecutive integers, nodes created with other ids are
+    supported but slower.
+    Open nodes are maintained in a priority queue ordered by their weight, nodes closed are just marked as
+    removed on the queue and discarded lazily when they reach the top of it.
+    """
     ORDER_BY_MAX = 'max'
     ORDER_BY_MIN = 'min'
+    _REMOVED = object()
 
     def __init__(self, collection: CollectionMap=None, node_serializer: NodeSerializer=None, selector=None):
-        super().__init__(collection, node_serializer)
+        super().__init__(collection if collection is not None else IndexedCollectionMap(), node_serializer)
         self.selector = selector or self.ORDER_BY_MAX
 
-        self.open_nodes = []
-        self.weights = []
+        self._heap = []
+        self._entries = {}
+        self._counter = count()
+
+    @property
+    def selector(self):
+        return self._selector
+
+    @selector.setter
+    def selector(self, selector):
+        self._selector = selector
+        # the queue is a min-heap, weights are negated when the greatest weight must be selected first
+        sign = -1 if selector == self.ORDER_BY_MAX else 1
+        heap = getattr(self, '_heap', None)
+        if heap and sign != self._sign:
+            # the nodes already open are reordered by the new selector
+            for entry in heap:
+                entry[0] = -entry[0]
+            heapq.heapify(heap)
+        self._sign = sign
 
     def get_len_open_nodes(self):
-        return len(self.open_nodes)
+        """
+        Returns the number of open nodes. Only open nodes have an entry, so this is constant time and closed
+        nodes still waiting on the queue are not counted.
+        """
+        return len(self._entries)
 
     def open_node(self, node):
-        bfunc = bisect.bisect_right if self.selector == self.ORDER_BY_MAX else bisect.bisect_left
-        index = bfunc(self.weights, node.weight)
-        self.open_nodes.insert(index, node.node_id)
-        self.weights.insert(index, node.weight)
+        # ties are broken in favour of the last opened node
+        entry = [self._sign*node.weight, -next(self._counter), node.node_id]
+        self._add_entry(entry)
+        heapq.heappush(self._heap, entry)
 
-    def close_node(self, node):
-        index = bisect.bisect_left(self.weights, node.weight)
+    def open_nodes(self, nodes):
+        """
+        Opens several nodes at once. Big batches are merged rebuilding the queue, which is linear, instead of
+        pushing the nodes one by one.
+        """
+        sign = self._sign
+        counter = self._counter
+        entries = [[sign*node.weight, -next(counter), node.node_id] for node in nodes]
+        for entry in entries:
+            self._add_entry(entry)
+        heap = self._heap
+        if len(entries) > len(heap):
+            heap.extend(entries)
+            heapq.heapify(heap)
+        else:
+            for entry in entries:
+                heapq.heappush(heap, entry)
 
-        while not self.open_nodes[index] == node.node_id:
-            index += 1
-        self.open_nodes.pop(index)
-        self.weights.pop(index)
+    def _add_entry(self, entry):
+        previous = self._entries.get(entry[-1])
+        if previous is not None:
+            # the node is reopened with its new weight
+            previous[-1] = self._REMOVED
+        self._entries[entry[-1]] = entry
+
+    def close_node(self, node):
+        entry = self._entries.pop(node.node_id)
+        entry[-1] = self._REMOVED
 
     def close_all(self):
-        self.open_nodes.clear()
-        self.weights.clear()
+        self._heap.clear()
+        self._entries.clear()
 
     def get_open_nodes(self):
-        open_nodes = reversed(self.open_nodes) if self.selector == self.ORDER_BY_MAX else self.open_nodes
-        return (self.get_node(node_id) for node_id in open_nodes)
+        """
+        Returns a generator over the open nodes sorted by weight, each open node is generated once.
+        Nodes closed while being traversed are popped from the queue, so the usual pattern of closing each
+        node after being visited costs O(log n) per node.
+        """
+        removed = self._REMOVED
+        heap = self._heap
+        generated = set()
+        while heap:
+            node_id = heap[0][-1]
+            if node_id is removed:
+                heapq.heappop(heap)
+                continue
+            if node_id in generated:
+                break
+            generated.add(node_id)
+            yield self.get_node(node_id)
+        else:
+            return
+        # a node has been kept open, the rest of the queue is traversed without consuming it
+        for entry in sorted(heap):
+            node_id = entry[-1]
+            if node_id is not removed and node_id not in generated:
+                generated.add(node_id)
+                yield self.get_node(node_id)
@@ -7,17 +7,26 @@ class Node(object):
     connected with other nodes trough a Graph.
     """
     repr_fields = ('node_id', 'weight', 'reference')
+    # the usual fields have their own slot, any other field is saved in the instance dictionary
+    __slots__ = (
+        'node_id', 'graph', 'in_nodes_ids', 'out_nodes_ids', 'weight', 'reference', 'context_id', 'test', 'action',
+        '__dict__'
+    )
 
     def __init__(self, graph, node_id, in_nodes_ids=None, out_nodes_ids=None):
         self.node_id = node_id
         self.graph = graph
         self.in_nodes_ids = set(in_nodes_ids or ())
         self.out_nodes_ids = set(out_nodes_ids or ())
+        self.weight = None
+        self.reference = None
+        self.context_id = None
+        self.test = None
+        self.action = None
 
     def __eq__(self, node):
         return isinstance(node, Node) and node.node_id == self.node_id
 
     def __repr__(self):
-        generator = ("'%s': %s" % (field, getattr(self, field)) for field in self.repr_fields if hasattr(self, field))
-        fields = ",".join(generator)
+        fields = ",".join(["'%s': %s" % (field, getattr(self, field, None)) for field in self.repr_fields])
         return "%s(%s)" % (self.__class__.__name__, fields)
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+from functools import lru_cache
 
 
 class Code(object):
@@ -13,6 +14,15 @@ class Code(object):
         self.code = code
 
 
+@lru_cache(maxsize=4096)
+def compile_python(source, filename):
+    """
+    Compiles a Python expression. Code objects are immutable so the same one is shared by all the nodes with
+    the same source code.
+    """
+    return compile(source + "\n", filename=filename, mode='eval')
+
+
 class PyParser(object):
     """
     This class parses Python code and convert it into a Code object
@@ -29,4 +39,4 @@ class PyParser(object):
         Returns:
             Code: Parsed python code.
         """
-        return Code(source, compile(source + "\n", filename=self.filename, mode='eval'))
+        return Code(source, compile_python(source, self.filename))
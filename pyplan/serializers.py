@@ -3,6 +3,8 @@ from abc import abstractmethod
 from functools import partial
 
 import marshal
+import pickle
+import types
 
 from .config import DEBUG_MODE
 from .decorators import inherit_doc
@@ -64,12 +66,14 @@ class FieldSerializer(object):
         raise NotImplementedError()
 
     @abstractmethod
-    def to_data(self, node):
+    def to_data(self, node, in_process=False):
         """
         This is the from_data inverse method, given a node, search for the field information in order to
         create a data structure that can be serialized.
         Parameters:
             node(Node): Is the node that is going to be serialized.
+            in_process(bool): If true the data is not going to leave the process, so it does not need to be
+                encoded and can be shared with the node.
         Returns:
             object: Field data that can be serialized.
         """
@@ -91,6 +95,9 @@ class NodeSerializer(object):
             the values are the `FieldSerializer` to use.
         """
         self.field_serializers = field_serializers or {}
+        # fields without serializer are copied as they are, so they are split from the others once
+        self._plain_fields = tuple(key for key, ser in self.field_serializers.items() if not ser)
+        self._custom_fields = tuple((key, ser) for key, ser in self.field_serializers.items() if ser)
 
     def from_data(self, graph, node_id, in_nodes_ids=None, out_nodes_ids=None, **kwargs) -> Node:
         """
@@ -110,38 +117,44 @@ class NodeSerializer(object):
         self.fields_from_data(node, kwargs)
         return node
 
-    def to_data(self, node):
+    def to_data(self, node, in_process=False):
         """
         Converts a `Node` into data that can be serialized and saved in a `CollectionMap`
         Parameters:
             node(Node): Is the node that is going to be serialized.
+            in_process(bool): If true the data is not going to leave the process, see `CollectionMap.in_process`.
         Returns:
             object: Data to be saved in a collection or to be send to another service.
         """
-        data = self.fields_to_data(node)
+        data = self.fields_to_data(node, in_process)
         data['node_id'] = node.node_id
-        data['in_nodes_ids'] = list(node.in_nodes_ids)
+        if node.in_nodes_ids:
+            data['in_nodes_ids'] = list(node.in_nodes_ids)
         data['out_nodes_ids'] = list(node.out_nodes_ids)
         return data
 
     def fields_from_data(self, node, data):
+        for key in self._plain_fields:
+            if key in data:
+                setattr(node, key, data[key])
         errors = []
-        for key, value in data.items():
-            if key in self.field_serializers:
+        for key, serializer in self._custom_fields:
+            if key in data:
                 try:
-                    serializer = self.field_serializers[key]
-                    if serializer:
-                        value = serializer.from_data(node, value)
-                    setattr(node, key, value)
+                    setattr(node, key, serializer.from_data(node, data[key]))
                 except FieldSerializationError as error:
                     errors.append(error)
         if errors:
             raise NodeSerializationError(node, errors)
 
-    def fields_to_data(self, node):
+    def fields_to_data(self, node, in_process=False):
         data = {}
-        for key, serializer in self.field_serializers.items():
-            value = serializer.to_data(node) if serializer else getattr(node, key, None)
+        for key in self._plain_fields:
+            value = getattr(node, key, None)
+            if value is not None:
+                data[key] = value
+        for key, serializer in self._custom_fields:
+            value = serializer.to_data(node, in_process)
             if value is not None:
                 data[key] = value
         return data
@@ -152,6 +165,10 @@ class FunctionFieldSerializer(FieldSerializer):
     """
     This serializer manages the serialization of fields whose content is Python evaluable code.
     If DEBUG_MODE is on we will also collection the source code on the field.
+    The field can also be a callable, it is called with the builtins as keyword arguments instead of being
+    evaluated.
+    Fields saved in collections that keep their records in the process are shared by reference, otherwise
+    their code objects are marshalled and their callables pickled.
     """
 
     def __init__(self, field_name, parser=None):
@@ -163,9 +180,21 @@ class FunctionFieldSerializer(FieldSerializer):
             return None
 
         if isinstance(data, dict):
+            if 'function' in data:
+                function = data['function']
+                if callable(function):
+                    return data
+                return {
+                    'function': pickle.loads(function),
+                    'source': data.get('source', None) if DEBUG_MODE else None
+                }
             if 'code' in data:
+                code = data['code']
+                if isinstance(code, types.CodeType) and (DEBUG_MODE or data.get('source', None) is None):
+                    # the field has not left the process, it is shared instead of copied
+                    return data
                 return {
-                    'code': marshal.loads(data['code']),
+                    'code': code if isinstance(code, types.CodeType) else marshal.loads(code),
                     'source': data.get('source', None) if DEBUG_MODE else None
                 }
         if isinstance(data, str):
@@ -177,13 +206,25 @@ class FunctionFieldSerializer(FieldSerializer):
                 }
             except SyntaxError as error:
                 raise FieldSerializationError(self.field_name, data, error)
+        if callable(data):
+            return {
+                'function': data,
+                'source': getattr(data, '__qualname__', None) if DEBUG_MODE else None
+            }
 
         raise NotImplementedError('Unsupported data %s' % str(data))
 
-    def to_data(self, node):
+    def to_data(self, node, in_process=False):
         func = getattr(node, self.field_name, None)
         if not func:
             return
+        if in_process:
+            return func
+        if 'function' in func:
+            return {
+                'function': pickle.dumps(func['function']),
+                'source': func.get('source', None) if DEBUG_MODE else None
+            }
         return {
             'code': marshal.dumps(func['code']),
             'source': func.get('source', None) if DEBUG_MODE else None
@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import logging
+
 from .builtins import Frame
 from .graph import Graph, SearchSpace
 from .logger import get_default_logger
@@ -9,8 +11,13 @@ from .strategies import get_default_strategy
 class NoMoreNodesError(Exception):
     """
     This exception is launched when a node generator is exhausted.
+    Attributes:
+        discarded_weight(object): The lowest weight of the nodes discarded for being above the solver
+            `max_weight`, if any.
     """
-    pass
+    def __init__(self, discarded_weight=None):
+        super().__init__()
+        self.discarded_weight = discarded_weight
 
 
 class MaxNodesReachedError(Exception):
@@ -31,6 +38,10 @@ class Solver(object):  # pylint: disable=too-many-instance-attributes
     each `Node` in the graph represent a decision to be made or an action to be executed.
     The way the Solver is configured is through different search/test/selection/execution strategies that can
     be configured.
+    Strategies receive the frame builtins as keyword arguments, except for those decorated with
+    `builtins_mapping` that receive a dictionary with the builtins that can be used as eval globals. Test
+    strategies decorated so also receive the frame `test_results` dictionary, where results can be memoized
+    during the frame.
     Attributes:
         domain(Graph): Is the domain representing the set of nodes defining how the search is done. Each of this
             nodes is instantiated and added to the search space graph.
@@ -47,6 +58,8 @@ class Solver(object):  # pylint: disable=too-many-instance-attributes
             a `MaxNodesReachedError` exception is raised.
         backtrack(bool): Where backtracking can be used or not to explore previously discarded nodes on
             the search space.
+        max_weight(object): Is a bound over the weights of the nodes to open, nodes weighted above it are
+            discarded. With `SELECTION_MIN` it allows iterative deepening searches, see `deepening_eval`.
     """
 
     def __init__(self, domain: Graph, solution_checker):
@@ -61,6 +74,7 @@ class Solver(object):  # pylint: disable=too-many-instance-attributes
         self.max_nodes = None
         self.builtins = None
         self.backtrack = True
+        self.max_weight = None
 
     def create_init_frame(self, store: ScopeStore=None, search_space: Graph=None):
         return Frame(self, store, search_space)
@@ -75,44 +89,107 @@ class Solver(object):  # pylint: disable=too-many-instance-attributes
             frame.next_frame()
         return frame
 
+    def deepening_eval(self, *args, store_factory, max_weight, search_space_factory=None):
+        """
+        Evaluates the nodes as `eval` does but using max_weight as the bound of the weights of the open nodes,
+        as in IDA*. When there are no nodes left under the bound the search is started again, from a new store,
+        using as the new bound the lowest weight discarded. Only the nodes under the bound are kept in the search
+        space, so with admissible weights, the cost so far plus a heuristic that never overestimates the remaining
+        cost, the first solution found is an optimal one and the memory used is much lower than with `eval`.
+        Parameters:
+            args(list): The nodes to evaluate.
+            store_factory(function): A function returning a new `ScopeStore` with the initial context.
+            max_weight(object): The bound of the first iteration, e.g. the heuristic of the initial context.
+            search_space_factory(function): A function returning a new search space for each iteration.
+        Returns:
+            Frame: The frame where the solution has been found.
+        """
+        previous_max_weight = self.max_weight
+        try:
+            while True:
+                self.max_weight = max_weight
+                search_space = search_space_factory() if search_space_factory else None
+                try:
+                    return self.eval(*args, store=store_factory(), search_space=search_space)
+                except NoMoreNodesError as error:
+                    if error.discarded_weight is None:
+                        raise
+                    self.logger.debug('No solution with max weight %s', max_weight)
+                    max_weight = error.discarded_weight
+        finally:
+            self.max_weight = previous_max_weight
+
     def step(self, current_nodes, frame: Frame, search_space: Graph):
         if frame.node_counter == self.max_nodes:
             raise MaxNodesReachedError(frame.node_counter)
-        self.logger.debug('Number of expanded nodes: %d', frame.node_counter)
-        instances = self.instantiate(current_nodes, frame, search_space)
-        self.logger.debug('Instances: %s', instances)
-        self.eval_nodes(instances, frame, search_space)
-        frame.selected = self.select(frame, search_space)
-        # manage deltas here, changes on the context
-        self.logger.debug('Selected Node: %s', frame.selected)
-        self.execute(node=frame.selected, domain=self.domain, **frame.w_builtins)
-        if not self.backtrack:
-            search_space.close_all()
-        return self.expand(node=frame.selected, domain=self.domain)
+        # the nodes updated during the step are saved once at the end of it
+        with search_space.batch():
+            debug = self.logger.isEnabledFor(logging.DEBUG)
+            if debug:
+                self.logger.debug('Number of expanded nodes: %d', frame.node_counter)
+            instances = self.instantiate(current_nodes, frame, search_space)
+            if debug:
+                self.logger.debug('Instances: %s', instances)
+            self.eval_nodes(instances, frame, search_space)
+            frame.selected = self.select(frame, search_space)
+            # manage deltas here, changes on the context
+            if debug:
+                self.logger.debug('Selected Node: %s', frame.selected)
+            if getattr(self.execute, 'builtins_mapping', False):
+                self.execute(frame.selected, self.domain, builtins=frame.w_globals)
+            else:
+                self.execute(node=frame.selected, domain=self.domain, **frame.w_builtins)
+            if not self.backtrack:
+                search_space.close_all()
+            return self.expand(node=frame.selected, domain=self.domain)
 
     def instantiate(self, dmn_nodes, frame: Frame, search_space: Graph):  # pylint: disable=no-self-use
         parent = frame.selected
         snode = search_space.node_builder
         context_id = parent.context_id if parent else frame.INIT_CONTEXT_ID
-        return list(snode(reference=node.node_id, in_nodes=parent, context_id=context_id) for node in dmn_nodes)
+        return [snode(reference=node.node_id, in_nodes=parent, context_id=context_id) for node in dmn_nodes]
 
     def eval_nodes(self, instances, frame: Frame, search_space: Graph):
         parent = frame.selected
         evaluations = self.evaluator(parent=parent, nodes=instances, **frame.ro_builtins)
-        self.logger.debug('New nodes weights: %s', evaluations)
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            self.logger.debug('New nodes weights: %s', evaluations)
+        weighted = []
+        max_weight = self.max_weight
         for node, weight in zip(instances, evaluations):
             if weight is not None:
                 # discard those modules that have not been weighted
-                setattr(node, 'weight', weight)
-                search_space.update_node(node)
-                search_space.open_node(node)
-        self.logger.debug('There are %d open nodes.', search_space.get_len_open_nodes())
+                if max_weight is not None and weight > max_weight:
+                    # the node is beyond the bound, its weight is only kept to compute the next bound
+                    if frame.discarded_weight is None or weight < frame.discarded_weight:
+                        frame.discarded_weight = weight
+                    continue
+                node.weight = weight
+                weighted.append(node)
+        search_space.update_nodes(weighted)
+        search_space.open_nodes(weighted)
+        if debug:
+            self.logger.debug('There are %d open nodes.', search_space.get_len_open_nodes())
 
     def select(self, frame: Frame, search_space: Graph):
+        strategy = self.test
+        by_reference = getattr(strategy, 'builtins_mapping', False)
+        builtins = frame.ro_globals if by_reference else frame.ro_builtins
+        debug = self.logger.isEnabledFor(logging.DEBUG)
+        context_id = frame.selected.context_id if frame.selected else frame.INIT_CONTEXT_ID
         for selection in search_space.get_open_nodes():
-            test = self.test(selection, domain=self.domain, **frame.ro_builtins)
-            self.logger.debug("Test of %s is %s", selection, test)
+            if selection.context_id != context_id:
+                # the node has been opened from another context, e.g. when backtracking, it is tested on its own
+                context_id = selection.context_id
+                frame.set_context(context_id)
+            if by_reference:
+                test = strategy(selection, self.domain, builtins=builtins, test_results=frame.test_results)
+            else:
+                test = strategy(selection, domain=self.domain, **builtins)
+            if debug:
+                self.logger.debug("Test of %s is %s", selection, test)
             search_space.close_node(selection)
             if test:
                 return selection
-        raise NoMoreNodesError()
+        raise NoMoreNodesError(frame.discarded_weight)
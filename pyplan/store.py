@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
-from abc import ABC, abstractmethod
-from collections import ChainMap, UserDict
+from abc import abstractmethod
 
 from .decorators import inherit_doc
 
@@ -14,12 +13,30 @@ class ScopeNotFoundError(Exception):
         return "Scope with id %s not found." % self.scope_id
 
 
-class CollectionMap(ABC):
+class ScopeReleasedError(Exception):
+    """
+    This exception is raised when a scope is used after being deleted from its store.
+    """
+
+    def __repr__(self):
+        return "The scope has been deleted."
+
+
+class CollectionMap(object):
     """
     This abstract class represents a Key-Value collection of records.
     Different implementations of this class allow to query and save the information using different
     persistence methods (files, databases, ...)
+    Attributes:
+        store_native(bool): If true, a `Graph` using the collection saves its `Node` objects as they are
+            instead of serializing them.
+        in_process(bool): If true, the records are kept by this process, so they are serialized without
+            encoding the data that can be shared, e.g. code objects are not marshalled.
     """
+    # collections are created for each scope, subclasses declaring their own slots have no instance dictionary
+    __slots__ = ()
+    store_native = False
+    in_process = False
 
     @abstractmethod
     def all_keys(self):
@@ -72,29 +89,99 @@ class CollectionMap(ABC):
         """
         raise NotImplementedError()
 
+    def get_records(self, keys):
+        """
+        Finds several records on the collection given their keys. Collections backed by external services
+        should override this method in order to request all the records at once.
+
+        Returns:
+            (iterator): An iterator over the records in the same order as the keys.
+        """
+        return (self.get_record(key) for key in keys)
+
+    def put_records(self, records):
+        """
+        Updates several records on the collection. Collections backed by external services should override
+        this method in order to save all the records at once.
+
+        Parameters:
+            records(iterable): Pairs of key and record to be updated.
+        """
+        for key, record in records:
+            self.put_record(key, record)
+
 
 @inherit_doc  # pylint: disable=too-many-ancestors
-class MemoryCollectionMap(UserDict, CollectionMap):
+class MemoryCollectionMap(dict, CollectionMap):
     """
     A `CollectionMap` whose records are maintained in memory.
+    The collection is a dictionary itself, records are accessed using the dictionary methods directly.
+    """
+    __slots__ = ()
+    store_native = True
+    in_process = True
+
+    all_keys = dict.__iter__
+    insert_record = dict.__setitem__
+    put_record = dict.__setitem__
+    put_records = dict.update
+    next_id = dict.__len__
+    get_record = dict.__getitem__
+
+
+@inherit_doc
+class IndexedCollectionMap(CollectionMap):
+    """
+    A `CollectionMap` whose records are maintained in memory in a list indexed by their keys. It suits
+    collections whose keys are generated by `next_id`, as the nodes of a `SearchSpace`, finding a record is just
+    indexing the list.
+    Records whose keys are not non negative integers, or that are too far beyond the end of the list, are kept
+    in a dictionary instead, so any key is accepted but only consecutive integer keys are fast.
     """
+    __slots__ = ('_records', '_sparse')
+    store_native = True
+    in_process = True
+    MAX_GAP = 1024  # maximum number of missing keys added to the list to save a record
+    _MISSING = object()
+
+    def __init__(self):
+        self._records = []
+        self._sparse = {}
+
     def all_keys(self):
-        return iter(self)
+        missing = self._MISSING
+        yield from (key for key, record in enumerate(self._records) if record is not missing)
+        yield from self._sparse
 
     def insert_record(self, key, record):
-        self[key] = record
+        self.put_record(key, record)
 
     def put_record(self, key, record):
-        self[key] = record
+        records = self._records
+        if type(key) is int and 0 <= key <= len(records) + self.MAX_GAP:  # pylint: disable=unidiomatic-typecheck
+            if key >= len(records):
+                records.extend([self._MISSING] * (key - len(records) + 1))
+            records[key] = record
+            if self._sparse:
+                self._sparse.pop(key, None)
+        else:
+            self._sparse[key] = record
 
     def next_id(self):
-        return len(self)
+        key = len(self._records)
+        while key in self._sparse:
+            key += 1
+        return key
 
     def get_record(self, key):
-        return self[key]
+        if type(key) is int and 0 <= key < len(self._records):  # pylint: disable=unidiomatic-typecheck
+            record = self._records[key]
+            if record is not self._MISSING:
+                return record
+        return self._sparse[key]
 
 
-class ScopeStore(ABC):
+class ScopeStore(object):
     """
     A store for `CollectionMap`.
     Allows the creation and deletion of collections as needed.
@@ -145,61 +232,167 @@ class ScopeStore(ABC):
 @inherit_doc  # pylint: disable=too-many-ancestors
 class ChainCollectionMap(CollectionMap):
     """
-    A `CollectionMap` whose records are maintained in memory.
+    A `CollectionMap` for a scope, the records written on the scope are saved in a local collection.
+    Instead of chaining the collections of its parent scopes, the collection keeps in memory a flat copy of all
+    the records visible from them, so finding a record costs a single lookup whatever the depth of the scope.
+    Records written on a scope are propagated to the scopes created from it unless they have their own one.
+    Attributes:
+        fallback(CollectionMap): Is the collection where the records not found in the scope are searched,
+            usually the init scope.
+        parent(ChainCollectionMap): Is the scope this one has been created from, if any.
+        local(CollectionMap): The collection where the records written on this scope are saved.
+        flat(dict): The records visible on this scope, both its own records and those of its parents.
+        children(list): The scopes created from this one.
+        released(bool): True once the scope has been deleted from its store, then it can not be used until
+            it is reused for a new scope.
     """
-    def __init__(self, chain):
-        self.chain = chain
+    __slots__ = ('fallback', 'parent', 'local', 'flat', 'children', '_own_keys', 'released')
+    _MISSING = object()
+
+    def __init__(self, fallback: CollectionMap, parent=None, local: CollectionMap=None):
+        self.fallback = fallback
+        self.parent = None
+        self.local = local if local is not None else get_default_collection()
+        self.flat = dict(parent.flat) if parent is not None else {}
+        self.children = []
+        self._own_keys = set()
+        self.released = False
+        if parent is not None:
+            self.parent = parent
+            parent.children.append(self)
+
+    def attach(self, local: CollectionMap, parent=None):
+        """
+        Prepares this empty scope to be used again, saving its records on local and inheriting the records of
+        parent if it is given.
+        """
+        self.local = local
+        self.released = False
+        if parent is not None:
+            self.parent = parent
+            self.flat.update(parent.flat)
+            parent.children.append(self)
+
+    def release(self):
+        """
+        Detaches the scope from its parent and children and removes all its records, leaving it empty.
+        """
+        if self.parent is not None:
+            self.parent.children.remove(self)
+            self.parent = None
+        for child in self.children:
+            child.parent = None
+        self.children.clear()
+        self.local = None
+        self._own_keys.clear()
+        self.flat.clear()
+        self.released = True
 
     def all_keys(self):
-        return iter(self.chain)
+        return iter(self._keys())
+
+    def _keys(self):
+        keys = set(self.fallback.all_keys())
+        keys.update(self.flat)
+        return keys
 
     def insert_record(self, key, record):
-        self.chain[key] = record
+        if self.released:
+            raise ScopeReleasedError()
+        self.local.insert_record(key, record)
+        self._own_keys.add(key)
+        self._propagate(key, record)
 
     def put_record(self, key, record):
-        self.chain[key] = record
+        if self.released:
+            raise ScopeReleasedError()
+        self.local.put_record(key, record)
+        self._own_keys.add(key)
+        self._propagate(key, record)
+
+    def _propagate(self, key, record):
+        self.flat[key] = record
+        for child in self.children:
+            if key not in child._own_keys:  # pylint: disable=protected-access
+                child._propagate(key, record)  # pylint: disable=protected-access
 
     def next_id(self):
-        return len(self.chain)
+        return len(self._keys())
 
     def get_record(self, key):
-        return self.chain[key]
+        if self.released:
+            raise ScopeReleasedError()
+        record = self.flat.get(key, self._MISSING)
+        if record is self._MISSING:
+            return self.fallback.get_record(key)
+        return record
 
 
 @inherit_doc
 class ChainScopeStore(ScopeStore):
     """
-    This is a store of collections where all the collections are chained using a `ChainMap`.
+    This is a store of collections where each collection inherits the records of its parent collection, and
+    all of them the records of the init collection. See `ChainCollectionMap`.
+    Deleted scopes are emptied and reused by the next created scopes. A deleted scope raises
+    `ScopeReleasedError` when used, but once reused any reference kept to it sees the new scope, so no reference
+    to a scope should be kept once it has been deleted.
+    Scopes whose ids are non negative integers, as the ids of the nodes of a `SearchSpace`, are kept in a list
+    indexed by their ids, other scopes are kept in a dictionary.
     """
+    POOL_SIZE = 64
 
     def __init__(self, init=None, factory=None):
         self.factory = factory or get_default_collection_factory()
         self.collections = {}
+        self.indexed_collections = []
         self._init = init or self.factory()
+        self._free = []
 
     @property
     def init(self) -> CollectionMap:
         return self._init
 
     def create_scope(self, scope_id: object, parent_id: object=None) -> CollectionMap:
-        new_scope = self.factory()
-        if parent_id:
-            parent = self.collections[parent_id]
-            chain_map = ChainCollectionMap(parent.chain.new_child(new_scope))
+        parent = self._find_scope(parent_id) if parent_id is not None else None
+        if self._free:
+            scope = self._free.pop()
+            scope.attach(self.factory(), parent)
+        else:
+            scope = ChainCollectionMap(self.init, parent, self.factory())
+        if type(scope_id) is int and scope_id >= 0:  # pylint: disable=unidiomatic-typecheck
+            scopes = self.indexed_collections
+            if scope_id >= len(scopes):
+                scopes.extend([None] * (scope_id - len(scopes) + 1))
+            scopes[scope_id] = scope
         else:
-            chain_map = ChainCollectionMap(ChainMap(new_scope, self.init))
-        self.collections[scope_id] = chain_map
-        return chain_map
+            self.collections[scope_id] = scope
+        return scope
 
     def delete_scope(self, scope_id: object):
-        self.collections.pop(scope_id)
+        scope = self._find_scope(scope_id)
+        if type(scope_id) is int and scope_id >= 0:  # pylint: disable=unidiomatic-typecheck
+            self.indexed_collections[scope_id] = None
+        else:
+            del self.collections[scope_id]
+        scope.release()
+        if len(self._free) < self.POOL_SIZE:
+            self._free.append(scope)
 
     def get_scope(self, scope_id: object) -> CollectionMap:
         try:
-            return self.collections[scope_id]
+            return self._find_scope(scope_id)
         except KeyError:
             raise ScopeNotFoundError(scope_id)
 
+    def _find_scope(self, scope_id):
+        if type(scope_id) is int and scope_id >= 0:  # pylint: disable=unidiomatic-typecheck
+            scopes = self.indexed_collections
+            scope = scopes[scope_id] if scope_id < len(scopes) else None
+            if scope is None:
+                raise KeyError(scope_id)
+            return scope
+        return self.collections[scope_id]
+
 
 @inherit_doc
 class NoScopeStore(ScopeStore):
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+from .decorators import builtins_mapping
 from .graph import Graph, SearchSpace
 from .nodes import Node
 
@@ -18,7 +19,7 @@ def succesors_generation(node: Node, domain: Graph, **kwargs):  # pylint: disabl
 
 
 def order_evaluation(nodes, open_nodes_counter, **kwargs):  # pylint: disable=unused-argument
-    return list(range(open_nodes_counter + len(nodes), open_nodes_counter, -1))
+    return range(open_nodes_counter + len(nodes), open_nodes_counter, -1)
 
 
 def random_evaluation(nodes, search_space, **kwargs):  # pylint: disable=unused-argument
@@ -29,21 +30,41 @@ def get_reference_node(node: Node, domain: Graph) -> Node:
     return domain.get_node(getattr(node, 'reference'))
 
 
-def python_test(node: Node, domain: Graph, **kwargs) -> bool:
+@builtins_mapping
+def python_test(node: Node, domain: Graph, builtins: dict=None, test_results: dict=None, **kwargs) -> bool:
     test = getattr(get_reference_node(node, domain), 'test', None)
     if not test:
         return True
+    namespace = kwargs if builtins is None else builtins
+    function = test.get('function', None)
+    code = test['code'] if function is None else function
+    # tests have no side effects, so the same code gives the same result while the frame does not change
+    results = test_results
+    if results is not None and code in results:
+        return results[code]
     try:
-        return bool(eval(test['code'], kwargs))  # pylint: disable=eval-used
+        if function is None:
+            result = bool(eval(code, namespace))  # pylint: disable=eval-used
+        else:
+            result = bool(function(**namespace))
     except Exception as error:
         raise PythonCodeError(test.get('source', '???')) from error
+    if results is not None:
+        results[code] = result
+    return result
 
 
-def python_execution(node: Node, domain: Graph, **kwargs) -> bool:
+@builtins_mapping
+def python_execution(node: Node, domain: Graph, builtins: dict=None, **kwargs) -> bool:
     action = getattr(get_reference_node(node, domain), 'action', None)
     if action:
+        namespace = kwargs if builtins is None else builtins
+        function = action.get('function', None)
         try:
-            eval(action['code'], kwargs)  # pylint: disable=eval-used
+            if function is None:
+                eval(action['code'], namespace)  # pylint: disable=eval-used
+            else:
+                function(**namespace)
         except Exception as error:
             raise PythonCodeError(action.get('source', '???')) from error
 
@@ -1,7 +1,23 @@
 # -*- coding: utf-8 -*-
+import itertools
 import random
 
 
+def shuffled_orders(items):
+    """
+    Gets every order `random.shuffle` can give to items. The orders are indexed by the random numbers the shuffle
+    draws, in the same order, so picking an order drawing those numbers gives the same result as the shuffle.
+    """
+    orders = []
+    swaps = list(reversed(range(1, len(items))))
+    for draws in itertools.product(*(range(i + 1) for i in swaps)):
+        order = list(items)
+        for i, j in zip(swaps, draws):
+            order[i], order[j] = order[j], order[i]
+        orders.append(tuple(order))
+    return tuple(orders)
+
+
 class Puzzle(object):
     """
     This class represents a N-Puzzle.
@@ -9,24 +25,62 @@ class Puzzle(object):
     Attributes:
         height(int): The puzzle height.
         width(int): The puzzle width.
-        _puzzle(list): Internal representation of the puzzle.
+        _puzzle(bytearray): Internal representation of the puzzle, one byte per tile.
+        _blank(int): Position of the blank tile, it is kept updated on each movement.
+        _deltas(dict): The change of the blank position for each movement.
+        _valid(tuple): The set of movements that are possible for each blank position.
     """
     UP = 'up'
     DOWN = 'down'
     LEFT = 'left'
     RIGHT = 'right'
     BLANK = 0  # This is the blank or missing tile, where movements can be performed.
+    __slots__ = ('height', 'width', '_puzzle', '_blank', '_deltas', '_valid')
 
     movements = (UP, DOWN, LEFT, RIGHT,)
+    # the orders to try the movements, a random order is picked as randbelow(4)*6 + randbelow(3)*2 + randbelow(2)
+    _orders = shuffled_orders(movements)
+    _solved = {}  # solved puzzles by size
+    _tables = {}  # movement tables by height and width
+    _pool = []  # tiles of released puzzles
+    POOL_SIZE = 64
 
-    def __init__(self, height: int, width: int, puzzle: list=None):
+    def __init__(self, height: int, width: int, puzzle: list=None, blank: int=None):
         """
         Generates a puzzle of size height x width.
+        If the position of the blank tile in the given puzzle is already known it can be passed as blank.
+        A bytearray puzzle is used as it is, any other sequence of tiles is copied.
         """
-        self._puzzle = puzzle or self.generate_puzzle(height, width)
-        assert isinstance(self._puzzle, list)
+        if not puzzle:
+            puzzle = self.generate_puzzle(height, width)
+        self._puzzle = puzzle if isinstance(puzzle, bytearray) else bytearray(puzzle)
         self.height = height
         self.width = width
+        self._blank = blank if blank is not None else self._puzzle.index(self.BLANK)
+        tables = self._tables.get((height, width))
+        if tables is None:
+            tables = self._tables[(height, width)] = self._movement_tables(height, width)
+        self._deltas, self._valid = tables
+
+    @classmethod
+    def _movement_tables(cls, height: int, width: int):
+        """
+        Computes the movement tables of a puzzle, these are the only place where the movement rules are defined.
+        Returns:
+            (dict, tuple): The position change for each movement and the movements possible on each position.
+        """
+        deltas = {cls.UP: -width, cls.DOWN: width, cls.LEFT: -1, cls.RIGHT: 1}
+        last_row = (height - 1) * width
+        valid = tuple(
+            frozenset(movement for movement, possible in (
+                (cls.UP, position > width),
+                (cls.DOWN, position < last_row),
+                (cls.LEFT, position % width > 0),
+                (cls.RIGHT, (position + 1) % width > 0),
+            ) if possible)
+            for position in range(height*width)
+        )
+        return deltas, valid
 
     def generate_puzzle(self, height: int, width: int):
         """
@@ -37,7 +91,7 @@ class Puzzle(object):
 
         self.height = height
         self.width = width
-        return [x for x in range(height*width)]
+        return bytearray(range(height*width))
 
     def get_tile(self, col, row):
         """
@@ -55,47 +109,81 @@ class Puzzle(object):
         rand = random.Random()
         if seed is not None:
             rand.seed(seed)
+        # this is random_move inlined, so each step does not need any method call
+        randrange = rand.randrange
+        orders = self._orders
+        deltas = self._deltas
+        valid = self._valid
+        puzzle = self._puzzle
+        blank = self._blank
         for _ in range(0, steps):
-            self.random_move(rand)
+            possible = valid[blank]
+            for movement in orders[randrange(4)*6 + randrange(3)*2 + randrange(2)]:
+                if movement in possible:
+                    position = blank + deltas[movement]
+                    puzzle[blank] = puzzle[position]
+                    puzzle[position] = self.BLANK
+                    blank = position
+                    break
+        self._blank = blank
         return self._puzzle
 
     def random_move(self, rand):
         """
         Performs a random possible move.
         """
-        random_movements = list(self.movements)
-        rand.shuffle(random_movements)
-        for movement in random_movements:
-            if self.can_move(movement):
-                return self._move(movement, self._puzzle)
+        possible = self._valid[self._blank]
+        for movement in self._orders[rand.randrange(4)*6 + rand.randrange(3)*2 + rand.randrange(2)]:
+            if movement in possible:
+                self._blank = self._move(movement, self._puzzle)
+                return self._puzzle
 
     def is_solved(self):
         """
         Checks if the puzzle is already solved.
         """
-        for i in range(self.size):
-            if i != self._puzzle[i]:
-                return False
-        return True
+        size = self.size
+        solved = self._solved.get(size)
+        if solved is None:
+            solved = self._solved[size] = bytes(range(size))
+        return self._puzzle == solved
 
     def _move(self, movement, puzzle, first_position=None):
-        first_position = first_position or self.get_blank_position(puzzle)
-        if movement == self.UP:
-            second_position = first_position - self.width
-        elif movement == self.DOWN:
-            second_position = first_position + self.width
-        elif movement == self.LEFT:
-            second_position = first_position - 1
-        elif movement == self.RIGHT:
-            second_position = first_position + 1
-        second = puzzle[second_position]
-        first = puzzle[first_position]
-        puzzle[first_position] = second
-        puzzle[second_position] = first
-        return puzzle
+        """
+        Swaps the blank tile of puzzle, a copy of this puzzle, with the tile next to it in the movement direction.
+        Returns:
+            int: The new position of the blank tile.
+        """
+        first_position = self._blank if first_position is None else first_position
+        second_position = first_position + self._deltas[movement]
+        puzzle[first_position], puzzle[second_position] = puzzle[second_position], puzzle[first_position]
+        return second_position
+
+    def slide(self, movement):
+        """
+        Performs a movement on this puzzle instead of on a copy of it.
+        Returns:
+            int: The new position of the blank tile.
+        """
+        self._blank = self._move(movement, self._puzzle)
+        return self._blank
 
     def move(self, movement, first_position=None):
-        return Puzzle(self.height, self.width, self._move(movement, list(self._puzzle), first_position))
+        if self._pool:
+            puzzle = self._pool.pop()
+            puzzle[:] = self._puzzle
+        else:
+            puzzle = bytearray(self._puzzle)
+        blank = self._move(movement, puzzle, first_position)
+        return Puzzle(self.height, self.width, puzzle, blank)
+
+    def release(self):
+        """
+        Releases a puzzle that is not going to be used anymore, its tiles are reused by the next movements.
+        """
+        if len(self._pool) < self.POOL_SIZE:
+            self._pool.append(self._puzzle)
+        self._puzzle = None
 
     def get_position(self, tile, puzzle=None):
         puzzle = puzzle or self._puzzle
@@ -116,26 +204,29 @@ class Puzzle(object):
         return self.height*self.width
 
     def get_blank_position(self, puzzle=None):
+        if puzzle is None:
+            return self._blank
         return self.get_position(self.BLANK, puzzle)
 
     def can_move(self, movement, position=None):
         """
         Checks if the given movement is possible or not.
         """
-        position = position or self.get_blank_position()
-        if movement == self.UP:
-            return position > self.width
-        elif movement == self.DOWN:
-            return position < ((self.height - 1) * self.width)
-        elif movement == self.LEFT:
-            return position % self.width > 0
-        elif movement == self.RIGHT:
-            return (position + 1) % self.width > 0
-        else:
+        position = self._blank if position is None else position
+        if movement in self._valid[position]:
+            return True
+        if movement not in self._deltas:
             raise ValueError(movement)
+        return False
 
     def to_list(self):
-        return self._puzzle
+        return list(self._puzzle)
+
+    def to_bytes(self):
+        """
+        Gets an immutable copy of the tiles, it can be used as a hashable key of the puzzle state.
+        """
+        return bytes(self._puzzle)
 
     def __str__(self):
-        return str([self._puzzle[i*self.width:(i*self.width + self.width)] for i in range(0, self.height)])
+        return str([list(self._puzzle[i*self.width:(i*self.width + self.width)]) for i in range(0, self.height)])
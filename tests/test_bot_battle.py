@@ -13,13 +13,19 @@ from ..pyplan.solver import Solver
 from ..pyplan.store import get_default_scope_store
 
 
+def pack_bots(*bots):
+    """
+    Packs the bots as a structure of arrays, there is a list for each bot attribute indexed by the bot slot.
+    """
+    return {key: [bot[key] for bot in bots] for key in bots[0]}
+
+
 @pytest.fixture
 def store():
     sstore = get_default_scope_store()
     context = sstore.init
     # our board is composed of squared tiles
     context.insert_record('arena', {'height': 25, 'width': 25})
-    context.insert_record('bot_ids', ['bender', 'c3po'])
     bender = {
         'id': 'bender',
         'x': 5,
@@ -42,29 +48,31 @@ def store():
         'health': 30,
         'movements': 3
     }
-    context.insert_record('bender', bender)
-    context.insert_record('c3po', c3po)
+    # bots are referenced by their slot in the bots arrays
+    context.insert_record('bots', pack_bots(bender, c3po))
     return sstore
 
 
 def get_current_bot(sget):
-    bot = sget('turn')
-    return sget(bot)
+    return sget('turn')
 
 
-def is_alive(bot):
-    return bot['health'] > 0
+def is_alive(bots, bot):
+    return bots['health'][bot] > 0
 
 
 def next_on(key, current, sget):
-    bot_ids = sget('bot_ids')
-    other_bots = (sget(bot_id) for bot_id in bot_ids if bot_id != current['id'])
-    return next((bot for bot in other_bots if is_alive(bot) and distance(current, bot) <= current[key]), None)
-
-
-def distance(one_bot, another_bot):
-    # this is a rough simplification
-    return (abs(one_bot['x'] - another_bot['x']) + abs(one_bot['y'] - another_bot['y']))/2
+    bots = sget('bots')
+    # the distance is a rough simplification, half the manhattan distance, it is compared doubled to avoid dividing
+    threshold = bots[key][current]*2
+    xs = bots['x']
+    ys = bots['y']
+    current_x = xs[current]
+    current_y = ys[current]
+    for bot, health in enumerate(bots['health']):
+        if bot != current and health > 0 and abs(current_x - xs[bot]) + abs(current_y - ys[bot]) <= threshold:
+            return bot
+    return None
 
 
 def enemy_onrange(sget):
@@ -79,28 +87,33 @@ def enemy_onsight(sget):
 
 def healthy(sget):
     current = get_current_bot(sget)
-    return current['health'] > current['max_health']*0.2
+    bots = sget('bots')
+    return bots['health'][current] > bots['max_health'][current]*0.2
 
 
 def attack(sget, sput, logger):
     current = get_current_bot(sget)
     other = next_on('range', current, sget)
-    other['health'] = other['health'] - current['damage']
-    sput(other['id'], other)
+    bots = sget('bots')
+    bots['health'][other] = bots['health'][other] - bots['damage'][current]
+    sput('bots', bots)
     sput('turn', None)
-    logger.info('%s ATTACKS %s!. %s health is %d', current['id'], other['id'], other['id'], other['health'])
+    ids = bots['id']
+    logger.info('%s ATTACKS %s!. %s health is %d', ids[current], ids[other], ids[other], bots['health'][other])
 
 
 def approach(sget, sput, logger):
     current = get_current_bot(sget)
     other = next_on('sight', current, sget)
-    move(current, other['x'], other['y'], sget, sput, logger)
+    bots = sget('bots')
+    move(current, bots['x'][other], bots['y'][other], sget, sput, logger)
 
 
 def flee(sget, sput, logger):
     current = get_current_bot(sget)
     other = next_on('sight', current, sget)
-    move(current, other['x'], other['y'], sget, sput, logger, inc=-1)
+    bots = sget('bots')
+    move(current, bots['x'][other], bots['y'][other], sget, sput, logger, inc=-1)
 
 
 def wander(sget, sput, logger):
@@ -111,53 +124,54 @@ def wander(sget, sput, logger):
     move(current, pos_x, pos_y, sget, sput, logger, inc=-1)
 
 
-def can_move(arena, pos_x, pos_y):
-    return arena['height'] > pos_x >= 0 and arena['width'] > pos_y >= 0
-
-
 def move(current, target_x, target_y, sget, sput, logger, inc=1):  # pylint: disable=too-many-arguments
-    current_x = current['x']
-    current_y = current['y']
+    bots = sget('bots')
+    current_x = bots['x'][current]
+    current_y = bots['y'][current]
     arena = sget('arena')
-    for _ in range(0, current['movements']):
-        if current_x < target_x and can_move(arena, current_x + inc, current_y):
+    # the arena bounds are read once, each step only compares integers
+    height = arena['height']
+    width = arena['width']
+    for _ in range(0, bots['movements'][current]):
+        if current_x < target_x and height > current_x + inc >= 0:
             current_x += inc
-        elif current_y < target_y and can_move(arena, current_x, current_y + inc):
+        elif current_y < target_y and width > current_y + inc >= 0:
             current_y += inc
-        elif current_x > target_x and can_move(arena, current_x - inc, current_y):
+        elif current_x > target_x and height > current_x - inc >= 0:
             current_x -= inc
-        elif current_y > target_y and can_move(arena, current_x, current_y - inc):
+        elif current_y > target_y and width > current_y - inc >= 0:
             current_y -= inc
-    current['x'] = current_x
-    current['y'] = current_y
-    sput(current['id'], current)
+    bots['x'][current] = current_x
+    bots['y'][current] = current_y
+    sput('bots', bots)
     sput('turn', None)
-    logger.info('%s MOVES to position (%d, %d)', current['id'], current_x, current_y)
+    logger.info('%s MOVES to position (%d, %d)', bots['id'][current], current_x, current_y)
 
 
 @pytest.fixture
 def domain():
     dom = Graph()
     node = dom.node_builder
+    # tests and actions are plain functions called with the builtins, so nothing is evaluated
     node(
         node_id='attack',
-        test=('enemy_onrange(sget) and healthy(sget)'),
-        action=('attack(sget, sput, logger)')
+        test=lambda sget, **_: enemy_onrange(sget) and healthy(sget),
+        action=lambda sget, sput, logger, **_: attack(sget, sput, logger)
     )
     node(
         node_id='approach',
-        test=('enemy_onsight(sget) and healthy(sget) and not enemy_onrange(sget)'),
-        action=('approach(sget, sput, logger)')
+        test=lambda sget, **_: enemy_onsight(sget) and healthy(sget) and not enemy_onrange(sget),
+        action=lambda sget, sput, logger, **_: approach(sget, sput, logger)
     )
     node(
         node_id='flee',
-        test=('enemy_onsight(sget) and not healthy(sget)'),
-        action=('flee(sget, sput, logger)')
+        test=lambda sget, **_: enemy_onsight(sget) and not healthy(sget),
+        action=lambda sget, sput, logger, **_: flee(sget, sput, logger)
     )
     node(
         node_id='wander',
-        test=('not enemy_onsight(sget)'),
-        action=('wander(sget, sput, logger)')
+        test=lambda sget, **_: not enemy_onsight(sget),
+        action=lambda sget, sput, logger, **_: wander(sget, sput, logger)
     )
     return dom
 
@@ -167,32 +181,23 @@ def is_solution(sget, **kwargs):  # pylint: disable=unused-argument
 
 
 def is_dead(context):
-    return not is_alive(context.get_record('c3po')) or not is_alive(context.get_record('bender'))
+    bots = context.get_record('bots')
+    return not all(is_alive(bots, bot) for bot in range(len(bots['id'])))
 
 
 def test_battle(store, domain):
     random.seed(0)
     solver = Solver(domain, is_solution)
-    builtins = {
-        'enemy_onsight': enemy_onsight,
-        'enemy_onrange': enemy_onrange,
-        'approach': approach,
-        'flee': flee,
-        'healthy': healthy,
-        'attack': attack,
-        'wander': wander,
-        'move': move
-    }
-    solver.builtins = builtins
     solver.backtrack = False
 
     all_nodes = list(node for node in domain)
     context = store.init
     frame = None
-    bots = ('c3po', 'bender')
+    bot_ids = context.get_record('bots')['id']
+    turns = [bot_ids.index(bot) for bot in ('c3po', 'bender')]
     step = 0
     while not is_dead(context):
-        context.insert_record('turn', bots[step % len(bots)])
+        context.insert_record('turn', turns[step % len(turns)])
         frame = solver.eval(*all_nodes, store=store, from_frame=frame)
         context = frame.context
         step += 1
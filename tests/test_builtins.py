@@ -6,6 +6,7 @@ from ..pyplan.builtins import Frame
 from ..pyplan.graph import SearchSpace, Graph
 from ..pyplan.solver import Solver
 from ..pyplan.store import ChainScopeStore
+from ..pyplan.strategies import python_test
 
 
 @pytest.fixture
@@ -40,3 +41,19 @@ def test_sput_all(frame):
     sput_all('hello', 'world')
     assert sget('hello') == 'world'
     assert frame.store.init.get_record('hello') == 'world'
+
+
+def test_test_results(frame):
+    calls = []
+    frame.ro_globals['check'] = lambda: calls.append(True) or True
+    reference = frame.solver.domain.create_node(test='check()')
+    nodes = [frame.search_space.create_node(reference=reference.node_id) for _ in range(2)]
+    bins = frame.ro_globals
+    assert all(python_test(node, frame.solver.domain, builtins=bins, test_results=frame.test_results) for node in nodes)
+    assert len(calls) == 1
+    assert 'test_results' not in frame.ro_builtins
+    # the context may change on the next frame, so the tests are evaluated again
+    frame.selected.context_id = Frame.INIT_CONTEXT_ID
+    frame.next_frame()
+    assert python_test(nodes[0], frame.solver.domain, builtins=bins, test_results=frame.test_results)
+    assert len(calls) == 2
@@ -1,10 +1,32 @@
 # -*- coding: utf-8 -*-
 # pylint: disable=redefined-outer-name
+import pickle
 import random
 
 import pytest
 
-from ..pyplan.graph import Graph, SearchSpace
+from ..pyplan.graph import DirectedGraph, Graph, SearchSpace
+from ..pyplan.store import MemoryCollectionMap
+
+
+class RecordsCollectionMap(MemoryCollectionMap):  # pylint: disable=too-many-ancestors
+    store_native = False
+
+
+class PickleCollectionMap(RecordsCollectionMap):  # pylint: disable=too-many-ancestors
+    in_process = False
+
+    def insert_record(self, key, record):
+        super().insert_record(key, pickle.dumps(record))
+
+    def put_record(self, key, record):
+        super().put_record(key, pickle.dumps(record))
+
+    def put_records(self, records):
+        super().put_records((key, pickle.dumps(record)) for key, record in records)
+
+    def get_record(self, key):
+        return pickle.loads(super().get_record(key))
 
 
 @pytest.fixture
@@ -24,12 +46,40 @@ def test_graph(graph):
 
     assert graph.is_successor(node_b, node_a)
     assert graph.is_successor(node_c, node_a)
+    assert graph.is_predecessor(node_a, node_b)
+    assert not graph.is_predecessor(node_b, node_a)
+    assert not graph.has_relationship(node_b, node_c)
     assert node_b in list(graph.successors(node_a))
     assert node_c in list(graph.successors(node_a))
     assert node_a in list(graph.predecessors(node_b))
     assert node_a in list(graph.predecessors(node_c))
 
 
+def test_successors_cache(graph):
+    node_a = graph.create_node()
+    node_b = graph.create_node(in_nodes=node_a)
+    assert graph.successors(node_a) == (node_b,)
+    assert graph.successors(node_a) is graph.successors(node_a)
+    node_c = graph.create_node()
+    graph.create_relationship(node_a, node_c)
+    assert node_c in graph.successors(node_a)
+    node_d = graph.create_node(in_nodes=node_a)
+    assert node_d in graph.successors(node_a)
+
+
+def test_directed_graph():
+    graph = DirectedGraph()
+    node_a = graph.create_node()
+    node_b = graph.create_node(in_nodes=node_a)
+    assert graph.is_successor(node_b, node_a)
+    assert not graph.is_successor(node_a, node_b)
+    assert not node_b.in_nodes_ids
+    assert node_a in list(graph.predecessors(node_b))
+    node_c = graph.create_node(in_nodes=node_b)
+    assert node_b in list(graph.predecessors(node_c))
+    assert not list(graph.predecessors(node_a))
+
+
 def test_search_space(search_space):
     nodeb = search_space.node_builder
     nodes = [nodeb(node_id=i, weight=i) for i in range(1, 5)]
@@ -61,3 +111,103 @@ def test_search_space(search_space):
         search_space.close_node(node)
 
     assert search_space.get_len_open_nodes() == 0
+
+
+def test_search_space_min(search_space):
+    nodeb = search_space.node_builder
+    search_space.selector = SearchSpace.ORDER_BY_MIN
+    nodes = [nodeb(weight=weight) for weight in (3, 1, 4, 2)]
+    search_space.open_nodes(nodes)
+    assert [node.weight for node in search_space.get_open_nodes()] == [1, 2, 3, 4]
+
+    # reopening a node moves it to its new position and leaves no duplicate behind
+    nodes[2].weight = 0
+    search_space.open_node(nodes[2])
+    assert [node.weight for node in search_space.get_open_nodes()] == [0, 1, 2, 3]
+    assert search_space.get_len_open_nodes() == 4
+
+    for node in search_space.get_open_nodes():
+        search_space.close_node(node)
+        if node.weight == 1:
+            break
+    assert [node.weight for node in search_space.get_open_nodes()] == [2, 3]
+
+    search_space.selector = SearchSpace.ORDER_BY_MAX
+    assert [node.weight for node in search_space.get_open_nodes()] == [3, 2]
+
+
+def test_search_space_ids(search_space):
+    node = search_space.create_node(node_id='x')
+    assert search_space.get_node('x') is node
+    assert search_space.create_node().node_id == 0
+
+
+def test_search_space_keep_open(search_space):
+    nodeb = search_space.node_builder
+    for weight in (3, 2, 1):
+        search_space.open_node(nodeb(weight=weight))
+    open_nodes = search_space.get_open_nodes()
+    assert next(open_nodes).weight == 3
+    search_space.open_node(nodeb(weight=10))
+    assert [node.weight for node in open_nodes] == [10, 2, 1]
+    assert [node.weight for node in search_space.get_open_nodes()] == [10, 3, 2, 1]
+    assert search_space.get_len_open_nodes() == 4
+
+
+def test_node_cache():
+    graph = Graph(RecordsCollectionMap(), cache_size=2)
+    nodes = [graph.create_node(weight=i) for i in range(3)]
+    assert graph.get_node(2) is nodes[2]
+    # the first node has been evicted from the cache so it is loaded again from the collection
+    node = graph.get_node(0)
+    assert node is not nodes[0]
+    assert node == nodes[0]
+    assert node.weight == 0
+
+
+def test_native_nodes(graph):
+    node = graph.create_node(weight=1)
+    assert graph.get_node(node.node_id) is node
+
+
+class CountCollectionMap(RecordsCollectionMap):  # pylint: disable=too-many-ancestors
+
+    def __init__(self):
+        super().__init__()
+        self.puts = 0
+
+    def put_record(self, key, record):
+        self.puts += 1
+        super().put_record(key, record)
+
+    def put_records(self, records):
+        self.puts += 1
+        super().put_records(records)
+
+
+def test_batch():
+    collection = CountCollectionMap()
+    graph = Graph(collection, cache_size=1)
+    node_a = graph.create_node(weight=1)
+    with graph.batch():
+        node_b = graph.create_node(in_nodes=node_a)
+        node_c = graph.create_node(in_nodes=node_a)
+        node_a.weight = 2
+        graph.update_node(node_a)
+        assert collection.puts == 0
+        assert graph.get_node(node_a.node_id) is node_a
+        assert {node.node_id for node in graph.successors(node_a)} == {node_b.node_id, node_c.node_id}
+    assert collection.puts == 1
+    copy = graph.get_node(node_a.node_id)
+    assert copy.weight == 2
+    assert copy.out_nodes_ids == {node_b.node_id, node_c.node_id}
+
+
+def test_encoded_records():
+    graph = Graph(PickleCollectionMap(), cache_size=1)
+    node_a = graph.create_node(test='1 + 1')
+    graph.create_node(in_nodes=node_a)
+    graph.create_node()
+    copy = graph.get_node(node_a.node_id)
+    assert copy is not node_a
+    assert eval(copy.test['code']) == 2  # pylint: disable=eval-used
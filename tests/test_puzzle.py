@@ -24,44 +24,81 @@ def is_solution(sget, **kwargs):
     return puzzle.is_solved()
 
 
-def distance(puzzle, current_position, expected_position):
-    col_i, row_i = puzzle.get_coordinates(current_position)
-    col_j, row_j = puzzle.get_coordinates(expected_position)
-    return abs(col_i - col_j) + abs(row_i - row_j)
+_DISTANCES = {}  # distance tables by height and width
+
+
+def distance_table(puzzle):
+    """
+    Gets the distance of each tile, when it is at each position, to the position where it should be.
+    The blank tile is not counted, so its distances are 0.
+    """
+    key = (puzzle.height, puzzle.width)
+    distances = _DISTANCES.get(key)
+    if distances is None:
+        # the row and column of each position, the goal position of a tile is the position equal to the tile
+        coordinates = [divmod(position, puzzle.width) for position in range(puzzle.size)]
+        distances = _DISTANCES[key] = (tuple(0 for _ in coordinates),) + tuple(
+            tuple(abs(row - goal_row) + abs(col - goal_col) for row, col in coordinates)
+            for goal_row, goal_col in coordinates[1:]
+        )
+    return distances
 
 
 def manhattan_distance(puzzle):
-    return sum(distance(puzzle, puzzle.get_position(i), i) for i in range(1, puzzle.size))
+    distances = distance_table(puzzle)
+    return sum([distances[tile][position] for position, tile in enumerate(puzzle.to_bytes())])
+
+
+def inversions(tiles):
+    """
+    Counts the pairs of tiles that are in reverse order.
+    """
+    count = 0
+    for index, tile in enumerate(tiles):
+        for other in tiles[index + 1:]:
+            if tile > other:
+                count += 1
+    return count
+
+
+_GOALS = {}  # goal rows and columns by height and width
+
+
+def goal_table(puzzle):
+    """
+    Gets the row and the column where each tile should be. The blank tile has no row or column, so it is never in
+    conflict with other tiles.
+    """
+    key = (puzzle.height, puzzle.width)
+    goals = _GOALS.get(key)
+    if goals is None:
+        width = puzzle.width
+        tiles = range(1, puzzle.size)
+        goals = _GOALS[key] = (
+            (None,) + tuple(tile//width for tile in tiles), (None,) + tuple(tile % width for tile in tiles)
+        )
+    return goals
 
 
 def row_conflicts(puzzle):
     conflicts = 0
-    for row in range(0, puzzle.height):
-        min_range = row*puzzle.width
-        max_range = min_range + puzzle.width
-        for col1 in range(0, puzzle.width):
-            tile1 = puzzle.get_tile(col1, row)
-            if tile1 != 0 and tile1 >= min_range and tile1 < max_range:
-                for col2 in range(col1 + 1, puzzle.width):
-                    tile2 = puzzle.get_tile(col2, row)
-                    if tile2 != 0 and tile2 >= min_range and tile2 < max_range:
-                        if tile1 > tile2:
-                            conflicts += 1
+    tiles = puzzle.to_bytes()
+    width = puzzle.width
+    goal_rows = goal_table(puzzle)[0]
+    for row, start in enumerate(range(0, puzzle.size, width)):
+        # only the tiles that belong to the row can be in conflict
+        conflicts += inversions([tile for tile in tiles[start:start + width] if goal_rows[tile] == row])
     return conflicts
 
 
 def col_conflicts(puzzle):
     conflicts = 0
-    for col in range(0, puzzle.width):
-        valid_values = frozenset((col + index*puzzle.width for index in range(0, puzzle.height)))
-        for row1 in range(0, puzzle.height):
-            tile1 = puzzle.get_tile(col, row1)
-            if tile1 != 0 and tile1 in valid_values:
-                for row2 in range(row1 + 1, puzzle.height):
-                    tile2 = puzzle.get_tile(col, row2)
-                    if tile2 != 0 and tile2 in valid_values:
-                        if tile1 > tile2:
-                            conflicts += 1
+    tiles = puzzle.to_bytes()
+    width = puzzle.width
+    goal_cols = goal_table(puzzle)[1]
+    for col in range(0, width):
+        # only the tiles that belong to the column can be in conflict
+        conflicts += inversions([tile for tile in tiles[col::width] if goal_cols[tile] == col])
     return conflicts
 
 
@@ -69,39 +106,61 @@ def linear_conflicts(puzzle):
     return row_conflicts(puzzle) + col_conflicts(puzzle)
 
 
+INVERSE_MOVE = {Puzzle.RIGHT: Puzzle.LEFT, Puzzle.LEFT: Puzzle.RIGHT, Puzzle.UP: Puzzle.DOWN, Puzzle.DOWN: Puzzle.UP}
+
+
 def is_inverse(move_a, move_b):
-    if move_a == Puzzle.RIGHT and move_b == Puzzle.LEFT:
-        return True
-    elif move_a == Puzzle.LEFT and move_b == Puzzle.RIGHT:
-        return True
-    elif move_a == Puzzle.UP and move_b == Puzzle.DOWN:
-        return True
-    elif move_a == Puzzle.DOWN and move_b == Puzzle.UP:
-        return True
-    else:
-        return False
+    return INVERSE_MOVE.get(move_a) == move_b
+
+
+def is_explored(explored, new_puzzle):
+    return new_puzzle.to_bytes() in explored
 
 
-def is_explored(sget, new_puzzle):
-    explored = sget('explored', {})
-    blank = new_puzzle.get_blank_position()
-    explored = explored.get(blank, None)
-    return new_puzzle in explored if explored else False
+def heuristic(puzzle):
+    return manhattan_distance(puzzle) + 2*linear_conflicts(puzzle)
+
+
+def slide_distance(puzzle, movement):
+    """
+    Performs a movement on the puzzle. Only the tile moved changes its position, so the manhattan distance of the
+    puzzle changes by the difference of the distances of that tile.
+    Returns:
+        int: The change of the manhattan distance.
+    """
+    blank = puzzle.get_blank_position()
+    position = puzzle.slide(movement)
+    tile = puzzle.get_tile(*puzzle.get_coordinates(blank))
+    distances = distance_table(puzzle)[tile]
+    return distances[blank] - distances[position]
+
+
+def get_manhattan(sget, puzzle):
+    manhattan = sget('manhattan', None)
+    return manhattan_distance(puzzle) if manhattan is None else manhattan
 
 
 def manhattan_heuristic(parent, nodes, sget, **kwargs):
+    # the puzzle is a copy of the one in the context, the children are weighed sliding its blank tile in place
+    # and sliding it back, so no puzzle is created for them
     puzzle = get_puzzle(sget)
+    # the weight of a child is the number of movements to reach it plus its heuristic, as in A*
+    cost = sget('movements', 0) + 1
+    # the manhattan distance of the children is the one of the puzzle updated with the tile moved
+    manhattan = get_manhattan(sget, puzzle)
+    explored = sget('explored', ())
     weights = []
-    previous_move = parent.reference if parent else None
+    # the move undoing the previous one is never weighted, it would go back to the parent puzzle
+    undo_move = INVERSE_MOVE.get(parent.reference) if parent else None
     for node in nodes:
         move_ref = node.reference
-        blank = puzzle.get_blank_position()
-        if puzzle.can_move(move_ref, blank) and not is_inverse(move_ref, previous_move):
-            next_puzzle = puzzle.move(move_ref, blank)
-            if not is_explored(sget, next_puzzle):
-                weights.append(manhattan_distance(next_puzzle) + 2*linear_conflicts(next_puzzle))
+        if move_ref != undo_move and puzzle.can_move(move_ref):
+            delta = slide_distance(puzzle, move_ref)
+            if not is_explored(explored, puzzle):
+                weights.append(cost + manhattan + delta + 2*linear_conflicts(puzzle))
             else:
                 weights.append(None)
+            puzzle.slide(INVERSE_MOVE[move_ref])
         else:
             weights.append(None)
     return weights
@@ -112,24 +171,28 @@ def can_move(sget, movement):
     return puzzle.can_move(movement)
 
 
-def move(sget, sput, sput_all, logger, movement):
+def move(sget, sput, logger, movement):
+    # the puzzle is a copy of the one in the context, so the movement is performed on it
     puzzle = get_puzzle(sget)
     movements = sget('movements', 0)
-    new_puzzle = puzzle.move(movement)
-    blank = new_puzzle.get_blank_position()
-    sput('puzzle', new_puzzle.to_list())
+    manhattan = get_manhattan(sget, puzzle) + slide_distance(puzzle, movement)
+    # the tiles are saved as bytes, the same immutable object is the puzzle record and its explored key
+    tiles = puzzle.to_bytes()
+    sput('puzzle', tiles)
     sput('movements', movements + 1)
-    explored = sget('explored', {})
-    explored.setdefault(blank, []).append(new_puzzle.to_list())
-    sput_all('explored', explored)
-    logger.debug('New puzzle: %s', new_puzzle)
+    sput('manhattan', manhattan)
+    # the explored puzzles are kept as a set of their tiles, bytes are hashed and compared without a python loop.
+    # The set is created with the init context and shared by all the scopes, so it is updated in place
+    sget('explored').add(tiles)
+    logger.debug('New puzzle: %s', puzzle)
 
 
 def create_movement(node, movement):
+    # the movement is bound in the test and action functions, so they are called without evaluating any code
     return node(
         node_id=movement,
-        test=('can_move(sget, "%s")' % movement),
-        action=('move(sget, sput, sput_all, logger, "%s")' % movement)
+        test=lambda sget, **_: can_move(sget, movement),
+        action=lambda sget, sput, logger, **_: move(sget, sput, logger, movement)
     )
 
 
@@ -144,6 +207,32 @@ def test_is_not_solved():
     assert not puzzle.is_solved()
 
 
+def test_blank_position():
+    puzzle = Puzzle(3, 3)
+    puzzle.shuffle(steps=20, seed=7)
+    assert puzzle.get_blank_position() == puzzle.to_list().index(Puzzle.BLANK)
+    moved = puzzle.move(next(movement for movement in puzzle.movements if puzzle.can_move(movement)))
+    assert moved.get_blank_position() == moved.to_list().index(Puzzle.BLANK)
+
+
+def test_slide():
+    puzzle = Puzzle(3, 3)
+    moved = puzzle.move(Puzzle.DOWN)
+    assert puzzle.slide(Puzzle.DOWN) == 3
+    assert puzzle.to_list() == moved.to_list()
+    puzzle.slide(Puzzle.UP)
+    assert puzzle.is_solved()
+
+
+def test_is_explored():
+    puzzle = Puzzle(3, 3)
+    moved = puzzle.move(Puzzle.RIGHT)
+    explored = {moved.to_bytes()}
+    assert is_explored(explored, Puzzle(3, 3, moved.to_list()))
+    assert not is_explored(explored, puzzle)
+    assert not is_explored(set(), moved)
+
+
 def test_get_tile():
     puzzle = Puzzle(2, 2)
     assert puzzle.get_tile(0, 0) == 0
@@ -182,6 +271,15 @@ def test_manhattan():
     assert manhattan_distance(puzzle) == 9
 
 
+def test_slide_distance():
+    puzzle = Puzzle(height=4, width=4)
+    puzzle.shuffle(steps=50, seed=5)
+    for movement in puzzle.movements * 10:
+        if puzzle.can_move(movement):
+            manhattan = manhattan_distance(puzzle)
+            assert manhattan + slide_distance(puzzle, movement) == manhattan_distance(puzzle)
+
+
 def test_linear_conflicts():
     puzzle = Puzzle(height=1, width=3, puzzle=[0, 2, 1])
     assert linear_conflicts(puzzle) == 1
@@ -206,11 +304,16 @@ def test_solve_puzzle():
     puzzle = Puzzle(height, width)
     puzzle.shuffle(steps=5, seed=13)
     assert not puzzle.is_solved()
-    store = get_default_scope_store()
-    context = store.init
-    context.insert_record('puzzle', puzzle.to_list())
-    context.insert_record('height', height)
-    context.insert_record('width', width)
+
+    def create_store():
+        store = get_default_scope_store()
+        context = store.init
+        context.insert_record('puzzle', puzzle.to_bytes())
+        context.insert_record('height', height)
+        context.insert_record('width', width)
+        context.insert_record('explored', set())
+        return store
+
     domain = Graph()
     node = domain.node_builder
 
@@ -220,18 +323,14 @@ def test_solve_puzzle():
     for movement in movements:
         domain.create_relationships(movement, movements)
 
-    builtins = {
-        'can_move': can_move,
-        'move': move
-    }
     solver = Solver(domain, is_solution)
     solver.evaluator = manhattan_heuristic
     solver.selector = SELECTION_MIN
-    solver.builtins = builtins
     solver.max_nodes = 400000
 
     solver.logger.debug('Initial puzzle: %s', puzzle)
-    solution = solver.eval(*movements, store=store)
+    solution = solver.deepening_eval(*movements, store_factory=create_store, max_weight=heuristic(puzzle))
 
-    puzzle = Puzzle(height, width, solution.final_context.get_record('puzzle'))
-    assert puzzle.is_solved()
+    context = solution.final_context
+    assert Puzzle(height, width, context.get_record('puzzle')).is_solved()
+    assert context.get_record('movements') <= 5
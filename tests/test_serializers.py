@@ -1,4 +1,7 @@
 # -*- coding: utf-8 -*-
+import types
+
+from ..pyplan.graph import Graph
 from ..pyplan.serializers import FunctionFieldSerializer, NodeSerializer
 
 
@@ -15,3 +18,32 @@ def test_node_serializer():
     node = serializer.from_data(graph=None, node_id=1, test='5+5')
     assert node is not None
     assert eval(node.test['code']) == 10  # pylint: disable=eval-used, no-member
+
+
+def test_function_serializer_round_trip():
+    serializer = NodeSerializer({'test': FunctionFieldSerializer('test')})
+    node = serializer.from_data(graph=None, node_id=1, test='5+5')
+    copy = serializer.from_data(graph=None, **serializer.to_data(node, in_process=True))
+    assert copy.test is node.test  # pylint: disable=no-member
+    copy = serializer.from_data(graph=None, **serializer.to_data(node))
+    assert isinstance(serializer.to_data(node)['test']['code'], bytes)
+    assert eval(copy.test['code']) == 10  # pylint: disable=eval-used, no-member
+
+
+def test_node_builder_compiles_code():
+    graph = Graph()
+    node = graph.node_builder(test='1 < 2', action='None')
+    assert isinstance(node.test['code'], types.CodeType)
+    assert isinstance(node.action['code'], types.CodeType)
+    assert graph.get_node(node.node_id).test is node.test
+
+
+def test_function_serializer_callable():
+    serializer = NodeSerializer({'test': FunctionFieldSerializer('test')})
+    node = serializer.from_data(graph=None, node_id=1, test=abs)
+    assert node.test['function'] is abs  # pylint: disable=no-member
+    copy = serializer.from_data(graph=None, **serializer.to_data(node, in_process=True))
+    assert copy.test is node.test  # pylint: disable=no-member
+    copy = serializer.from_data(graph=None, **serializer.to_data(node))
+    assert isinstance(serializer.to_data(node)['test']['function'], bytes)
+    assert copy.test['function'] is abs  # pylint: disable=no-member
@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 from ..pyplan.solver import Solver
-from ..pyplan.store import NoScopeStore
+from ..pyplan.strategies import SELECTION_MIN
+from ..pyplan.store import ChainScopeStore, NoScopeStore
 from ..pyplan.graph import Graph
 
 
-def has_result(sget, **kwargs):  # pylint: disable=unused-argument
+def has_result(sget, logger, node_counter, open_nodes_counter):  # pylint: disable=unused-argument
     return sget('result', None) is not None
 
 
@@ -40,6 +41,50 @@ def test_simple_solver():
     # run the solver
     solver = Solver(domain=domain, solution_checker=has_result)
     solver.backtrack = False
-    solver.eval(root, store=store)
+    frame = solver.eval(root, store=store)
 
     assert context.get_record('result') == 'Can not vote'
+    assert '__builtins__' not in frame.ro_builtins
+    assert '__builtins__' not in frame.w_builtins
+
+
+def test_deepening_solver():
+    stores = []
+
+    def create_store():
+        stores.append(NoScopeStore())
+        return stores[-1]
+
+    domain = Graph()
+    node = domain.node_builder
+    root = node()
+    node(node_id='far', in_nodes=root, action="sput('result', 'far')")
+    node(node_id='near', in_nodes=root, action="sput('result', 'near')")
+    weights = {'far': 3, 'near': 2}
+
+    solver = Solver(domain=domain, solution_checker=has_result)
+    solver.selector = SELECTION_MIN
+    solver.evaluator = lambda nodes, **kwargs: [weights.get(node.reference, 0) for node in nodes]
+    frame = solver.deepening_eval(root, store_factory=create_store, max_weight=0)
+
+    # the root is opened on the first iteration, the nearest node on the second one
+    assert len(stores) == 2
+    assert frame.final_context.get_record('result') == 'near'
+    assert solver.max_weight is None
+
+
+def test_backtracking_context():
+    store = ChainScopeStore()
+    domain = Graph()
+    node = domain.node_builder
+    root = node()
+    node(node_id='first', in_nodes=root, action="sput('x', 1)")
+    # this node is selected after backtracking from the first one, it is tested on the context it was opened from
+    node(node_id='second', in_nodes=root, test="sget('x', None) is None", action="sput('result', 'second')")
+    weights = {'first': 1, 'second': 2}
+
+    solver = Solver(domain=domain, solution_checker=has_result)
+    solver.selector = SELECTION_MIN
+    solver.evaluator = lambda nodes, **kwargs: [weights.get(node.reference, 0) for node in nodes]
+    frame = solver.eval(root, store=store)
+    assert frame.final_context.get_record('result') == 'second'
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 import pytest
 
-from ..pyplan.store import ChainScopeStore
+from ..pyplan.store import (
+    ChainScopeStore, IndexedCollectionMap, MemoryCollectionMap, ScopeNotFoundError, ScopeReleasedError
+)
 
 
 def test_scopes():
@@ -23,3 +25,86 @@ def test_scopes():
         col1.get_record('b')
     with pytest.raises(KeyError):
         col3.get_record('b')
+
+
+def test_scopes_propagation():
+    store = ChainScopeStore()
+    root = store.create_scope(0)
+    child = store.create_scope(1, 0)
+    grandchild = store.create_scope(2, 1)
+
+    child.put_record('a', 'child')
+    root.put_record('a', 'root')
+    root.put_record('b', 'root')
+    store.init.put_record('c', 'init')
+
+    assert root.get_record('a') == 'root'
+    assert child.get_record('a') == 'child'
+    assert grandchild.get_record('a') == 'child'
+    assert grandchild.get_record('b') == 'root'
+    assert grandchild.get_record('c') == 'init'
+    assert sorted(grandchild.all_keys()) == ['a', 'b', 'c']
+
+    store.delete_scope(2)
+    assert child.children == []
+    with pytest.raises(ScopeReleasedError):
+        grandchild.get_record('a')
+    with pytest.raises(ScopeReleasedError):
+        grandchild.put_record('a', 'deleted')
+
+    scope = store.create_scope(3, 0)
+    assert scope is grandchild
+    assert scope.get_record('a') == 'root'
+    assert list(scope.local) == []
+
+
+def test_scopes_factory():
+    collections = []
+
+    def factory():
+        collections.append(MemoryCollectionMap())
+        return collections[-1]
+
+    store = ChainScopeStore(factory=factory)
+    scope = store.create_scope(1)
+    scope.put_record('a', True)
+    assert collections[0] is store.init
+    assert collections[1].get_record('a')
+    assert 'a' not in store.init
+
+def test_scope_ids():
+    store = ChainScopeStore()
+    for scope_id in (5, 'a', -1, True):
+        scope = store.create_scope(scope_id)
+        assert store.get_scope(scope_id) is scope
+        store.delete_scope(scope_id)
+        with pytest.raises(ScopeNotFoundError):
+            store.get_scope(scope_id)
+    with pytest.raises(ScopeNotFoundError):
+        store.get_scope(100)
+
+
+def test_indexed_collection():
+    collection = IndexedCollectionMap()
+    collection.insert_record(collection.next_id(), 'a')
+    collection.insert_record(3, 'b')
+    assert collection.get_record(0) == 'a'
+    assert collection.get_record(3) == 'b'
+    assert list(collection.all_keys()) == [0, 3]
+    assert collection.next_id() == 4
+    for key in (-1, 1, 4):
+        with pytest.raises(KeyError):
+            collection.get_record(key)
+
+    collection.insert_record('c', 'c')
+    collection.insert_record(-1, 'd')
+    collection.insert_record(10**9, 'e')
+    collection.insert_record(5, 'f')
+    assert collection.get_record('c') == 'c'
+    assert collection.get_record(-1) == 'd'
+    assert collection.get_record(10**9) == 'e'
+    assert collection.get_record(5) == 'f'
+    assert sorted(collection.all_keys(), key=str) == sorted([0, 3, 5, 'c', -1, 10**9], key=str)
+    collection.insert_record(7, 'g')
+    collection.put_record(6, 'h')
+    assert collection.next_id() == 8